@@ -6,190 +6,276 @@ Checks system requirements and helps troubleshoot common issues
 
 import sys
 import os
-import subprocess
+import platform
+import functools
+import importlib.util
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
+_BAR = "=" * 70
+_HEADER = f"{_BAR}\n  TIME TRACKER DIAGNOSTIC TOOL\n{_BAR}\n"
+# The interpreter version is fixed for the life of the process
+_PYTHON_OK = f"✅ Python {sys.version_info.major}.{sys.version_info.minor}.{sys.version_info.micro} (OK)"
+
+
+# Heavy modules are imported on first use only, so menu actions that never
+# touch the Objective-C bridge don't pay for loading it.
+@functools.lru_cache(maxsize=None)
+def _appkit():
+    import AppKit
+    return AppKit
+
+
+@functools.lru_cache(maxsize=None)
+def _sqlite3():
+    import sqlite3
+    return sqlite3
+
+
+class CheckResults:
+    """What one diagnostic check found, plus its progress lines"""
+    
+    def __init__(self):
+        self.issues = []
+        self.warnings = []
+        self.success = []
+        self.log_lines = []
+    
+    def log(self, message):
+        """Record a progress line"""
+        self.log_lines.append(f"{message}\n")
+
+
 class DiagnosticTool:
     def __init__(self):
         self.issues = []
         self.warnings = []
         self.success = []
+        self.db_path = Path.home() / ".timetracker" / "tracking.db"
+        self._menu = {
+            '1': self._rerun_diagnostics,
+            '2': self.view_database,
+            '3': self._show_log_info,
+            '4': self.test_permissions,
+            '5': self.reset_database,
+        }
     
     def print_header(self):
-        print("=" * 70)
-        print("  TIME TRACKER DIAGNOSTIC TOOL")
-        print("=" * 70)
-        print()
+        sys.stdout.write(_HEADER + "\n")
     
-    def check_python_version(self):
+    def check_python_version(self, results):
         """Check if Python version is compatible"""
-        print("🔍 Checking Python version...")
+        results.log("🔍 Checking Python version...")
         
         version = sys.version_info
         if version.major >= 3 and version.minor >= 7:
-            self.success.append(f"✅ Python {version.major}.{version.minor}.{version.micro} (OK)")
+            results.success.append(_PYTHON_OK)
+            return True
         else:
-            self.issues.append(f"❌ Python {version.major}.{version.minor} is too old. Need Python 3.7+")
+            results.issues.append(f"❌ Python {version.major}.{version.minor} is too old. Need Python 3.7+")
+            return False
     
-    def check_dependencies(self):
+    def check_dependencies(self, results):
         """Check if required packages are installed"""
-        print("🔍 Checking dependencies...")
+        results.log("🔍 Checking dependencies...")
         
-        required = ['rumps', 'PyObjC']
+        # Probe for the modules without importing them; loading PyObjC just to
+        # confirm it exists pulls in the whole Objective-C bridge
+        required = {
+            'rumps': ['rumps'],
+            'PyObjC': ['AppKit', 'Quartz'],
+        }
         
-        for package in required:
-            try:
-                if package == 'PyObjC':
-                    import AppKit
-                    import Quartz
-                    self.success.append(f"✅ {package} installed")
-                elif package == 'rumps':
-                    import rumps
-                    self.success.append(f"✅ {package} installed")
-            except ImportError:
-                self.issues.append(f"❌ {package} not installed. Run: pip3 install --user {package}")
+        for package, modules in required.items():
+            if all(importlib.util.find_spec(module) for module in modules):
+                results.success.append(f"✅ {package} installed")
+            else:
+                results.issues.append(f"❌ {package} not installed. Run: pip3 install --user {package}")
     
-    def check_database(self):
+    def check_database(self, results):
         """Check if database exists and is accessible"""
-        print("🔍 Checking database...")
+        results.log("🔍 Checking database...")
         
-        db_path = Path.home() / ".timetracker" / "tracking.db"
+        sqlite3 = _sqlite3()
         
-        if db_path.exists():
-            try:
-                import sqlite3
-                conn = sqlite3.connect(db_path)
-                cursor = conn.cursor()
-                cursor.execute("SELECT COUNT(*) FROM app_usage")
-                count = cursor.fetchone()[0]
-                conn.close()
-                self.success.append(f"✅ Database found with {count} records")
-            except Exception as e:
-                self.issues.append(f"❌ Database error: {str(e)}")
-        else:
-            self.warnings.append(f"⚠️  No database found (will be created on first run)")
+        # mode=rw refuses to create the file, so a failed open doubles as the
+        # existence check without a separate stat() beforehand
+        try:
+            conn = sqlite3.connect(f"{self.db_path.as_uri()}?mode=rw", uri=True,
+                                   isolation_level=None)
+        except sqlite3.OperationalError:
+            results.warnings.append(f"⚠️  No database found (will be created on first run)")
+            return
+        
+        try:
+            cursor = conn.cursor()
+            # WAL is persisted in the file header, so every later connection
+            # (including the tracker's) skips the rollback-journal overhead
+            cursor.execute("PRAGMA journal_mode=WAL")
+            cursor.execute("PRAGMA synchronous=NORMAL")
+            # Covering index so the statistics in view_database can be
+            # answered from the index instead of scanning every row
+            cursor.execute('''
+                CREATE INDEX IF NOT EXISTS idx_date_app_dur
+                ON app_usage(date, app_name, duration)
+            ''')
+            cursor.execute("SELECT COUNT(*) FROM app_usage")
+            count = cursor.fetchone()[0]
+            results.success.append(f"✅ Database found with {count} records")
+        except Exception as e:
+            results.issues.append(f"❌ Database error: {str(e)}")
+        finally:
+            conn.close()
     
-    def check_permissions(self):
+    def check_permissions(self, results):
         """Check if Accessibility permissions might be granted"""
-        print("🔍 Checking system permissions...")
+        results.log("🔍 Checking system permissions...")
         
         # We can't directly check this without running the app
         # But we can provide guidance
-        self.warnings.append("⚠️  Cannot verify Accessibility permissions from here")
-        print("\n  To check manually:")
-        print("  1. Open System Settings")
-        print("  2. Go to Privacy & Security > Accessibility")
-        print("  3. Look for Python or TimeTracker in the list")
-        print("  4. Make sure it's enabled")
+        results.warnings.append("⚠️  Cannot verify Accessibility permissions from here")
+        results.log("\n  To check manually:\n"
+                    "  1. Open System Settings\n"
+                    "  2. Go to Privacy & Security > Accessibility\n"
+                    "  3. Look for Python or TimeTracker in the list\n"
+                    "  4. Make sure it's enabled")
     
-    def check_disk_space(self):
+    def check_disk_space(self, results):
         """Check available disk space"""
-        print("🔍 Checking disk space...")
+        results.log("🔍 Checking disk space...")
         
         try:
-            import shutil
-            total, used, free = shutil.disk_usage(Path.home())
+            st = os.statvfs(Path.home())
             
-            free_gb = free // (1024 ** 3)
+            free_gb = (st.f_bavail * st.f_frsize) >> 30
             
             if free_gb > 1:
-                self.success.append(f"✅ Plenty of disk space ({free_gb} GB free)")
+                results.success.append(f"✅ Plenty of disk space ({free_gb} GB free)")
             else:
-                self.warnings.append(f"⚠️  Low disk space ({free_gb} GB free)")
+                results.warnings.append(f"⚠️  Low disk space ({free_gb} GB free)")
         except Exception as e:
-            self.warnings.append(f"⚠️  Could not check disk space: {str(e)}")
+            results.warnings.append(f"⚠️  Could not check disk space: {str(e)}")
     
-    def check_macos_version(self):
+    def check_macos_version(self, results):
         """Check macOS version"""
-        print("🔍 Checking macOS version...")
+        results.log("🔍 Checking macOS version...")
         
         try:
-            result = subprocess.run(['sw_vers', '-productVersion'], 
-                                  capture_output=True, text=True)
-            version = result.stdout.strip()
+            version = platform.mac_ver()[0]
             
             # Extract major version
             major = int(version.split('.')[0])
             
             if major >= 10:
-                self.success.append(f"✅ macOS {version}")
+                results.success.append(f"✅ macOS {version}")
             else:
-                self.warnings.append(f"⚠️  macOS {version} might not be supported")
+                results.warnings.append(f"⚠️  macOS {version} might not be supported")
         except Exception as e:
-            self.warnings.append(f"⚠️  Could not determine macOS version: {str(e)}")
+            results.warnings.append(f"⚠️  Could not determine macOS version: {str(e)}")
     
-    def check_files_exist(self):
+    def check_files_exist(self, results):
         """Check if required files are present"""
-        print("🔍 Checking required files...")
+        results.log("🔍 Checking required files...")
         
         current_dir = Path(__file__).parent
         required_files = ['time_tracker.py', 'requirements.txt']
         
+        # One directory read answers every lookup, instead of a stat() per file
+        with os.scandir(current_dir) as entries:
+            present = {entry.name for entry in entries}
+        
         for filename in required_files:
-            filepath = current_dir / filename
-            if filepath.exists():
-                self.success.append(f"✅ Found {filename}")
+            if filename in present:
+                results.success.append(f"✅ Found {filename}")
             else:
-                self.issues.append(f"❌ Missing {filename}")
+                results.issues.append(f"❌ Missing {filename}")
     
-    def test_window_detection(self):
+    def test_window_detection(self, results):
         """Test if we can detect active windows"""
-        print("🔍 Testing window detection...")
+        results.log("🔍 Testing window detection...")
         
         try:
-            from AppKit import NSWorkspace
-            from Quartz import CGWindowListCopyWindowInfo, kCGWindowListOptionOnScreenOnly, kCGNullWindowID
-            
-            workspace = NSWorkspace.sharedWorkspace()
+            workspace = _appkit().NSWorkspace.sharedWorkspace()
             active_app = workspace.activeApplication()
             app_name = active_app.get('NSApplicationName', 'Unknown')
             
             if app_name and app_name != 'Unknown':
-                self.success.append(f"✅ Window detection working (current: {app_name})")
+                results.success.append(f"✅ Window detection working (current: {app_name})")
             else:
-                self.warnings.append("⚠️  Window detection might need permissions")
+                results.warnings.append("⚠️  Window detection might need permissions")
         except Exception as e:
-            self.issues.append(f"❌ Window detection failed: {str(e)}")
+            results.issues.append(f"❌ Window detection failed: {str(e)}")
     
     def run_diagnostics(self):
         """Run all diagnostic checks"""
         self.print_header()
         
-        self.check_python_version()
-        self.check_macos_version()
-        self.check_dependencies()
-        self.check_files_exist()
-        self.check_database()
-        self.check_disk_space()
-        self.check_permissions()
-        self.test_window_detection()
+        # Every other check would only report follow-on failures of an
+        # unsupported interpreter, so stop here if it is too old
+        results = CheckResults()
+        python_ok = self.check_python_version(results)
+        self.add_results(results)
+        if not python_ok:
+            self.print_results()
+            return
+        
+        checks = [
+            self.check_macos_version,
+            self.check_dependencies,
+            self.check_files_exist,
+            self.check_database,
+            self.check_disk_space,
+            self.check_permissions,
+            self.test_window_detection,
+        ]
+        
+        # The checks are independent and mostly wait on I/O, so overlap them.
+        # Each fills its own CheckResults, and map() hands those back in
+        # submission order, so the output is the same however the threads finish.
+        with ThreadPoolExecutor(max_workers=len(checks)) as executor:
+            for results in executor.map(self.run_check, checks):
+                self.add_results(results)
         
+        self.print_results()
+    
+    def run_check(self, check):
+        """Run one check and return what it found"""
+        results = CheckResults()
+        check(results)
+        return results
+    
+    def add_results(self, results):
+        """Print a check's progress lines and keep its findings for the report"""
+        sys.stdout.write("".join(results.log_lines))
+        self.success.extend(results.success)
+        self.warnings.extend(results.warnings)
+        self.issues.extend(results.issues)
+    
+    def print_results(self):
+        """Print the collected successes, warnings and issues"""
         print()
-        print("=" * 70)
+        print(_BAR)
         print("  DIAGNOSTIC RESULTS")
-        print("=" * 70)
+        print(_BAR)
         print()
         
         if self.success:
             print("✅ SUCCESSES:")
-            for msg in self.success:
-                print(f"  {msg}")
+            sys.stdout.write("\n".join(f"  {msg}" for msg in self.success) + "\n")
             print()
         
         if self.warnings:
             print("⚠️  WARNINGS:")
-            for msg in self.warnings:
-                print(f"  {msg}")
+            sys.stdout.write("\n".join(f"  {msg}" for msg in self.warnings) + "\n")
             print()
         
         if self.issues:
             print("❌ ISSUES FOUND:")
-            for msg in self.issues:
-                print(f"  {msg}")
+            sys.stdout.write("\n".join(f"  {msg}" for msg in self.issues) + "\n")
             print()
-            print("=" * 70)
+            print(_BAR)
             print("  RECOMMENDED ACTIONS")
-            print("=" * 70)
+            print(_BAR)
             print()
             print("1. Install missing dependencies:")
             print("   ./install.sh")
@@ -200,9 +286,9 @@ class DiagnosticTool:
             print("3. If still having issues, check README.md for troubleshooting")
             print()
         else:
-            print("=" * 70)
+            print(_BAR)
             print("  🎉 ALL CHECKS PASSED!")
-            print("=" * 70)
+            print(_BAR)
             print()
             print("Your system is ready to run the Time Tracker.")
             print()
@@ -212,69 +298,58 @@ class DiagnosticTool:
     
     def interactive_menu(self):
         """Provide an interactive troubleshooting menu"""
-        print()
-        print("=" * 70)
-        print("  TROUBLESHOOTING MENU")
-        print("=" * 70)
-        print()
-        print("1. Re-run diagnostics")
-        print("2. View database contents")
-        print("3. Check log files")
-        print("4. Test permissions")
-        print("5. Reset database (WARNING: deletes all data)")
-        print("6. Exit")
-        print()
-        
-        choice = input("Enter choice (1-6): ").strip()
-        
-        if choice == '1':
-            self.__init__()  # Reset
-            self.run_diagnostics()
-            self.interactive_menu()
-        elif choice == '2':
-            self.view_database()
-            self.interactive_menu()
-        elif choice == '3':
-            print("\n⚠️  No log files currently implemented.")
-            print("Errors are printed to console when running time_tracker.py")
-            self.interactive_menu()
-        elif choice == '4':
-            self.test_permissions()
-            self.interactive_menu()
-        elif choice == '5':
-            self.reset_database()
-            self.interactive_menu()
-        elif choice == '6':
-            print("\n👋 Goodbye!")
-            return
-        else:
-            print("\n❌ Invalid choice")
-            self.interactive_menu()
+        while True:
+            print()
+            print(_BAR)
+            print("  TROUBLESHOOTING MENU")
+            print(_BAR)
+            print()
+            print("1. Re-run diagnostics")
+            print("2. View database contents")
+            print("3. Check log files")
+            print("4. Test permissions")
+            print("5. Reset database (WARNING: deletes all data)")
+            print("6. Exit")
+            print()
+            
+            choice = input("Enter choice (1-6): ").strip()
+            
+            if choice == '6':
+                print("\n👋 Goodbye!")
+                return
+            
+            self._menu.get(choice, self._invalid_choice)()
+    
+    def _rerun_diagnostics(self):
+        self.__init__()  # Reset
+        self.run_diagnostics()
+    
+    def _show_log_info(self):
+        print("\n⚠️  No log files currently implemented.")
+        print("Errors are printed to console when running time_tracker.py")
+    
+    def _invalid_choice(self):
+        print("\n❌ Invalid choice")
     
     def view_database(self):
         """Quick view of database contents"""
-        db_path = Path.home() / ".timetracker" / "tracking.db"
-        
-        if not db_path.exists():
+        if not self.db_path.exists():
             print("\n❌ No database found")
             return
         
         try:
-            import sqlite3
-            conn = sqlite3.connect(db_path)
+            sqlite3 = _sqlite3()
+            # Read-only: skips journal setup and never contends for the write lock
+            conn = sqlite3.connect(f"{self.db_path.as_uri()}?mode=ro", uri=True,
+                                   isolation_level=None)
             cursor = conn.cursor()
             
-            cursor.execute("SELECT COUNT(*) FROM app_usage")
-            total = cursor.fetchone()[0]
-            
-            cursor.execute("SELECT COUNT(DISTINCT date) FROM app_usage")
-            days = cursor.fetchone()[0]
-            
-            cursor.execute("SELECT COUNT(DISTINCT app_name) FROM app_usage")
-            apps = cursor.fetchone()[0]
-            
-            cursor.execute("SELECT SUM(duration) FROM app_usage")
-            total_time = cursor.fetchone()[0] or 0
+            cursor.execute("""
+                SELECT COUNT(*), COUNT(DISTINCT date), COUNT(DISTINCT app_name),
+                       COALESCE(SUM(duration), 0)
+                FROM app_usage
+            """)
+            total, days, apps, total_time = cursor.fetchone()
             
             conn.close()
             
@@ -291,8 +366,7 @@ class DiagnosticTool:
         print("\n🔍 Testing permissions...")
         
         try:
-            from AppKit import NSWorkspace
-            workspace = NSWorkspace.sharedWorkspace()
+            workspace = _appkit().NSWorkspace.sharedWorkspace()
             active_app = workspace.activeApplication()
             
             if active_app:
@@ -308,17 +382,22 @@ class DiagnosticTool:
     def reset_database(self):
         """Reset the database (with confirmation)"""
         print("\n⚠️  WARNING: This will delete ALL tracking data!")
+        print("   Quit the Time Tracker first, or it will keep writing to the old database")
         confirm = input("Type 'YES' to confirm: ").strip()
         
         if confirm != 'YES':
             print("❌ Cancelled")
             return
         
-        db_path = Path.home() / ".timetracker" / "tracking.db"
-        
-        if db_path.exists():
+        if self.db_path.exists():
             try:
-                db_path.unlink()
+                self.db_path.unlink()
+                # WAL mode keeps recent writes in sidecar files that belong
+                # to the deleted database, so they have to go too
+                for suffix in ("-wal", "-shm"):
+                    sidecar = self.db_path.with_name(self.db_path.name + suffix)
+                    if sidecar.exists():
+                        sidecar.unlink()
                 print("✅ Database deleted")
                 print("   A new database will be created on next run")
             except Exception as e:
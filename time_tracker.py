@@ -6,19 +6,182 @@ Tracks active window focus time and generates daily reports
 
 import sqlite3
 import rumps
-from AppKit import NSWorkspace, NSApplicationActivationPolicyRegular
+from AppKit import (
+    NSWorkspace,
+    NSWorkspaceDidActivateApplicationNotification,
+    NSWorkspaceWillSleepNotification,
+    NSWorkspaceDidWakeNotification,
+    NSApplicationActivationPolicyRegular,
+    NSDate,
+    NSRunLoop,
+    NSRunLoopCommonModes,
+    NSTimer
+)
 from Quartz import (
     CGWindowListCopyWindowInfo,
     kCGWindowListOptionOnScreenOnly,
-    kCGNullWindowID
+    kCGWindowListExcludeDesktopElements,
+    kCGNullWindowID,
+    CGEventSourceSecondsSinceLastEventType,
+    kCGEventSourceStateHIDSystemState,
+    kCGAnyInputEventType
 )
+from collections import defaultdict
+import csv
 from datetime import datetime, timedelta
 import json
-import os
 from pathlib import Path
+import queue
+import string
+import subprocess
 import time
 import threading
 
+# Sentinels understood by the session writer thread
+_FLUSH = object()
+_STOP = object()
+
+# Kept as one constant string so every batch hits the connection's cached
+# prepared statement instead of being parsed and planned again
+_INSERT_SESSION_SQL = '''
+    INSERT INTO app_usage (app_name, window_title, start_time, end_time, duration, date)
+    VALUES (?, ?, ?, ?, ?, ?)
+'''
+
+_UPSERT_HOURLY_SQL = '''
+    INSERT INTO hourly_rollup (date, hour, duration) VALUES (?, ?, ?)
+    ON CONFLICT(date, hour) DO UPDATE SET duration = duration + excluded.duration
+'''
+
+_REPLACE_SUMMARY_SQL = '''
+    INSERT OR REPLACE INTO daily_summary (date, total_active_time, apps_data)
+    VALUES (?, ?, ?)
+'''
+
+_MENU_SEPARATOR = "─" * 40
+
+# Page skeleton for the daily report; generate_daily_report fills in the
+# summary values and the pre-rendered table rows and hour bars
+_REPORT_TEMPLATE = string.Template("""
+<!DOCTYPE html>
+<html>
+<head>
+    <title>Time Tracker Report - $today</title>
+    <meta charset="utf-8"/>
+    <style>
+        body {
+            font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', sans-serif;
+            max-width: 1000px;
+            margin: 0 auto;
+            padding: 20px;
+            background: #f5f5f7;
+        }
+        .container {
+            background: white;
+            border-radius: 12px;
+            padding: 30px;
+            box-shadow: 0 2px 10px rgba(0,0,0,0.1);
+        }
+        h1 {
+            color: #1d1d1f;
+            margin-bottom: 10px;
+        }
+        .summary {
+            background: #007aff;
+            color: white;
+            padding: 20px;
+            border-radius: 8px;
+            margin: 20px 0;
+        }
+        .summary h2 {
+            margin: 0 0 10px 0;
+        }
+        table {
+            width: 100%;
+            border-collapse: collapse;
+            margin: 20px 0;
+        }
+        th, td {
+            padding: 12px;
+            text-align: left;
+            border-bottom: 1px solid #e5e5e7;
+        }
+        th {
+            background: #f5f5f7;
+            font-weight: 600;
+        }
+        .bar {
+            background: #007aff;
+            height: 20px;
+            border-radius: 4px;
+            transition: width 0.3s;
+        }
+        .bar-container {
+            background: #e5e5e7;
+            border-radius: 4px;
+            overflow: hidden;
+        }
+        .hour-chart {
+            display: flex;
+            align-items: flex-end;
+            justify-content: space-between;
+            height: 200px;
+            margin: 30px 0;
+            padding: 10px;
+            border: 1px solid #e5e5e7;
+            border-radius: 8px;
+        }
+        .hour-bar {
+            flex: 1;
+            background: #007aff;
+            margin: 0 2px;
+            border-radius: 4px 4px 0 0;
+            min-height: 2px;
+            position: relative;
+        }
+        .hour-label {
+            text-align: center;
+            font-size: 11px;
+            color: #666;
+            margin-top: 5px;
+        }
+    </style>
+</head>
+<body>
+    <div class="container">
+        <h1>Daily Time Tracking Report</h1>
+        <p style="color: #666;">Generated: $generated</p>
+        
+        <div class="summary">
+            <h2>Total Active Time</h2>
+            <h1 style="margin: 0;">$total</h1>
+        </div>
+        
+        <h2>Application Usage</h2>
+        <table>
+            <thead>
+                <tr>
+                    <th>Application</th>
+                    <th>Total Time</th>
+                    <th>Sessions</th>
+                    <th>Percentage</th>
+                    <th>Usage</th>
+                </tr>
+            </thead>
+            <tbody>
+$rows
+            </tbody>
+        </table>
+        
+        <h2>Hourly Activity</h2>
+        <div class="hour-chart">
+$bars
+        </div>
+    </div>
+</body>
+</html>
+""")
+
 class TimeTrackerApp(rumps.App):
     def __init__(self):
         super(TimeTrackerApp, self).__init__(
@@ -34,33 +197,67 @@ class TimeTrackerApp(rumps.App):
         # Initialize database
         self.init_database()
         
+        # Long-lived connections, so the schema and page cache aren't thrown
+        # away on every query: one for the writer thread, one read-only
+        # connection for stats, reports and exports. Every read happens on
+        # the main thread, and under WAL it never waits for the writer, so
+        # the reader needs no lock.
+        self._db_lock = threading.Lock()
+        self._writer_conn = self.connect_database()
+        self._reader_conn = self.connect_database(read_only=True)
+        
         # Tracking state
         self.current_app = None
         self.current_window = None
         self.session_start = None
-        self.is_tracking = True
-        self.last_activity = datetime.now()
+        self.session_start_mono = None  # time.monotonic() at start, a lower bound on the end
+        # Set while tracking; background loops block on it while paused
+        # instead of waking up to check
+        self._run_event = threading.Event()
+        self._run_event.set()
+        # Cleared between the will-sleep and did-wake notifications; the
+        # watchdog blocks on it the same way
+        self._awake_event = threading.Event()
+        self._awake_event.set()
         self.idle_threshold = 300  # 5 minutes in seconds
+        self.watchdog_interval = 30  # seconds between idle checks
+        self.idle_poll_interval = 2  # seconds between checks for the user coming back
+        self.window_title_ttl = 30  # seconds to reuse a window title for the same app
+        self._window_cache = (0.0, None, None)  # (fetched at, app name, window title)
+        
+        # Finished sessions are queued and written in batches, so an app
+        # switch doesn't cost a commit (and fsync) of its own
+        self.write_interval = 30  # max seconds a session waits to be written
+        self.write_batch_size = 500
+        self.checkpoint_interval = 300  # seconds between WAL checkpoints
+        self._write_queue = queue.Queue()
+        
+        # Running per-app totals for today, so the menu refresh needs no SQL.
+        # Loaded from the database once a day and bumped as sessions close.
+        self._totals_lock = threading.Lock()
+        self._today_date = None
+        self._today_totals = defaultdict(int)
         
-        # Create menu items that will be updated dynamically
+        # Session state is touched from the main thread (app switches, menu
+        # actions) and from the idle watchdog thread
+        self._session_lock = threading.Lock()
+        
+        # Create menu items that will be updated dynamically. They are made
+        # once and only retitled or hidden afterwards. rumps keys menu items
+        # by their initial title, so each app slot starts with its own.
         self.total_time_item = rumps.MenuItem("⏱️  Total: 0m", callback=None)
-        self.app1_item = rumps.MenuItem("", callback=None)
-        self.app2_item = rumps.MenuItem("", callback=None)
-        self.app3_item = rumps.MenuItem("", callback=None)
-        self.app4_item = rumps.MenuItem("", callback=None)
-        self.app5_item = rumps.MenuItem("", callback=None)
+        self.app_items = [rumps.MenuItem(f"app slot {i}", callback=None) for i in range(5)]
+        for item in self.app_items:
+            item.hidden = True
+        self._menu_slots = [self.total_time_item] + self.app_items
         
         # Menu items
         self.menu = [
             rumps.MenuItem("📊 Live Tracking", callback=None),
-            rumps.MenuItem("─" * 40, callback=None),
+            rumps.MenuItem(_MENU_SEPARATOR, callback=None),
             self.total_time_item,
-            rumps.MenuItem("─" * 40, callback=None),
-            self.app1_item,
-            self.app2_item,
-            self.app3_item,
-            self.app4_item,
-            self.app5_item,
+            rumps.MenuItem(_MENU_SEPARATOR, callback=None),
+            *self.app_items,
             None,
             rumps.MenuItem("Today's Summary", callback=self.show_today_summary),
             rumps.MenuItem("View Report", callback=self.view_report),
@@ -73,19 +270,54 @@ class TimeTrackerApp(rumps.App):
             rumps.MenuItem("Quit", callback=self.quit_app)
         ]
         
-        # Start tracking thread
+        # Start session writer thread
+        self.writer_thread = threading.Thread(target=self.write_sessions, daemon=True)
+        self.writer_thread.start()
+        self.reload_today_totals()
+        
+        # App switches are pushed to us by NSWorkspace on the main run loop,
+        # so nothing has to poll for them
+        notification_center = NSWorkspace.sharedWorkspace().notificationCenter()
+        self.activation_observer = notification_center.addObserverForName_object_queue_usingBlock_(
+            NSWorkspaceDidActivateApplicationNotification, None, None, self.app_activated
+        )
+        self.sleep_observer = notification_center.addObserverForName_object_queue_usingBlock_(
+            NSWorkspaceWillSleepNotification, None, None, self.system_will_sleep
+        )
+        self.wake_observer = notification_center.addObserverForName_object_queue_usingBlock_(
+            NSWorkspaceDidWakeNotification, None, None, self.system_did_wake
+        )
+        
+        # Start idle watchdog thread
         self.tracking_thread = threading.Thread(target=self.track_active_window, daemon=True)
         self.tracking_thread.start()
         
-        # Start menu update thread
-        self.menu_update_thread = threading.Thread(target=self.update_menu_display, daemon=True)
-        self.menu_update_thread.start()
+        # Refresh the live stats from a timer on the main run loop, since
+        # AppKit menu items must only be touched from the main thread
+        self._last_rendered = None
+        self.menu_timer = None
+        self.start_menu_timer()
         
+    @property
+    def is_tracking(self):
+        return self._run_event.is_set()
+    
+    @is_tracking.setter
+    def is_tracking(self, value):
+        if value:
+            self._run_event.set()
+        else:
+            self._run_event.clear()
+    
     def init_database(self):
         """Initialize SQLite database for tracking data"""
         conn = sqlite3.connect(self.db_path)
         cursor = conn.cursor()
         
+        # Persisted in the database file: readers no longer block the writer
+        # and a commit appends to the log instead of rewriting pages
+        cursor.execute("PRAGMA journal_mode=WAL")
+        
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS app_usage (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -108,16 +340,70 @@ class TimeTrackerApp(rumps.App):
             )
         ''')
         
+        # Time per hour of the day, kept up to date by the session writer so
+        # the report's hourly chart doesn't parse every start_time of the day
+        cursor.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'hourly_rollup'"
+        )
+        backfill_rollup = cursor.fetchone() is None
+        
         cursor.execute('''
-            CREATE INDEX IF NOT EXISTS idx_date ON app_usage(date)
+            CREATE TABLE IF NOT EXISTS hourly_rollup (
+                date TEXT NOT NULL,
+                hour INTEGER NOT NULL,
+                duration INTEGER NOT NULL,
+                PRIMARY KEY (date, hour)
+            )
         ''')
         
+        # Sessions recorded before the table existed
+        if backfill_rollup:
+            cursor.execute('''
+                INSERT INTO hourly_rollup (date, hour, duration)
+                SELECT date, CAST(strftime('%H', start_time) AS INTEGER), SUM(duration)
+                FROM app_usage
+                GROUP BY 1, 2
+            ''')
+        
+        cursor.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = 'idx_date_app_dur'"
+        )
+        migrating = cursor.fetchone() is None
+        
+        # Covering index: the per-day GROUP BY app_name / SUM(duration) queries
+        # are answered from the index alone, without touching table rows.
+        # It also serves plain date lookups, which makes idx_date redundant,
+        # and nothing filters on app_name without a date, so idx_app_name goes too.
         cursor.execute('''
-            CREATE INDEX IF NOT EXISTS idx_app_name ON app_usage(app_name)
+            CREATE INDEX IF NOT EXISTS idx_date_app_dur
+            ON app_usage(date, app_name, duration)
         ''')
+        cursor.execute("DROP INDEX IF EXISTS idx_date")
+        cursor.execute("DROP INDEX IF EXISTS idx_app_name")
         
         conn.commit()
+        
+        # Give the planner row statistics for the new index once
+        if migrating:
+            cursor.execute("ANALYZE")
+            conn.commit()
         conn.close()
+    
+    def connect_database(self, read_only=False):
+        """Open a long-lived connection with the tracker's performance pragmas"""
+        if read_only:
+            conn = sqlite3.connect(f"{self.db_path.as_uri()}?mode=ro", uri=True)
+        else:
+            conn = sqlite3.connect(self.db_path, check_same_thread=False,
+                                   isolation_level=None)
+        
+        # WAL keeps the database consistent at NORMAL; only the last commits
+        # before a power loss can be lost
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA cache_size=-64000")  # 64 MB
+        conn.execute("PRAGMA temp_store=MEMORY")
+        conn.execute("PRAGMA mmap_size=268435456")  # 256 MB
+        return conn
         
     def get_active_window_info(self):
         """Get the currently active window and application"""
@@ -127,20 +413,33 @@ class TimeTrackerApp(rumps.App):
             active_app = workspace.activeApplication()
             app_name = active_app.get('NSApplicationName', 'Unknown')
             
+            # Listing every on-screen window is the expensive part, and the
+            # title only matters when a session starts, so reuse it while the
+            # same app stays in front
+            now = time.monotonic()
+            cached_at, cached_app, cached_title = self._window_cache
+            if app_name == cached_app and now - cached_at < self.window_title_ttl:
+                return app_name, cached_title
+            
             # Get window title
             window_list = CGWindowListCopyWindowInfo(
-                kCGWindowListOptionOnScreenOnly,
+                kCGWindowListOptionOnScreenOnly | kCGWindowListExcludeDesktopElements,
                 kCGNullWindowID
             )
             
-            window_title = "Unknown"
-            for window in window_list:
-                owner_name = window.get('kCGWindowOwnerName', '')
-                if owner_name == app_name:
-                    window_title = window.get('kCGWindowName', 'No Title')
-                    if window_title and window_title != '':
-                        break
+            # Match on the owner's pid (an int compare) and only look at the
+            # normal window layer (0), skipping the menu bar and helper panels
+            # the same process owns
+            pid = active_app.get('NSApplicationProcessIdentifier')
+            window_title = next(
+                (window['kCGWindowName'] for window in window_list
+                 if window.get('kCGWindowOwnerPID') == pid
+                 and window.get('kCGWindowLayer', 1) == 0
+                 and window.get('kCGWindowName')),
+                'No Title'
+            )
             
+            self._window_cache = (now, app_name, window_title)
             return app_name, window_title
             
         except Exception as e:
@@ -160,59 +459,244 @@ class TimeTrackerApp(rumps.App):
             
         date_str = start_time.strftime('%Y-%m-%d')
         
-        try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
+        with self._totals_lock:
+            self._write_queue.put((app_name, window_title, start_time.isoformat(),
+                                   end_time.isoformat(), duration, date_str))
+            if date_str == self._today_date:
+                self._today_totals[app_name] += duration
+    
+    def reload_today_totals(self):
+        """Rebuild the running per-app totals for today from the database"""
+        # Holding the lock keeps sessions from being queued between the
+        # flush inside get_today_stats and replacing the totals
+        with self._totals_lock:
+            self._today_date = datetime.now().strftime('%Y-%m-%d')
+            self._today_totals = defaultdict(int, self.get_today_stats())
+    
+    def write_sessions(self):
+        """Write queued sessions to the database in batches - runs in background thread"""
+        pending = []
+        received = 0
+        flush_at = None
+        last_checkpoint = time.monotonic()
+        summaries_checked = None  # day on which closed days were last checked
+        write_failed = False
+        
+        while True:
+            timeout = None if flush_at is None else max(0, flush_at - time.monotonic())
+            try:
+                item = self._write_queue.get(timeout=timeout)
+                received += 1
+            except queue.Empty:
+                item = _FLUSH
             
-            cursor.execute('''
-                INSERT INTO app_usage (app_name, window_title, start_time, end_time, duration, date)
-                VALUES (?, ?, ?, ?, ?, ?)
-            ''', (app_name, window_title, start_time.isoformat(), end_time.isoformat(), duration, date_str))
+            if item is not _FLUSH and item is not _STOP:
+                pending.append(item)
+                if flush_at is None:
+                    flush_at = time.monotonic() + self.write_interval
+                # After a failed write, wait for the retry deadline rather
+                # than trying again on every new session
+                if len(pending) < self.write_batch_size or write_failed:
+                    continue
             
-            conn.commit()
-            conn.close()
+            if pending:
+                try:
+                    self.write_batch(pending)
+                    write_failed = False
+                except Exception as e:
+                    # Typically another process holding the write lock past
+                    # the busy timeout; keep the batch and try again later
+                    print(f"Error saving sessions: {e}")
+                    write_failed = True
             
-        except Exception as e:
-            print(f"Error saving session: {e}")
+            if pending and not write_failed:
+                # Days before today are finished, so each gets a summary. Late
+                # sessions (one that ran past midnight) refresh their day's, and
+                # once a day any closed day still missing one is filled in.
+                try:
+                    today = datetime.now().strftime('%Y-%m-%d')
+                    closed_days = {session[5] for session in pending if session[5] < today}
+                    if today != summaries_checked:
+                        closed_days.update(self.get_unsummarized_days(today))
+                        summaries_checked = today
+                    if closed_days:
+                        self.write_daily_summaries(closed_days)
+                except Exception as e:
+                    print(f"Error saving daily summaries: {e}")
+                
+                # Fold the WAL back into the database now and then so it
+                # doesn't grow without bound
+                if time.monotonic() - last_checkpoint >= self.checkpoint_interval:
+                    try:
+                        with self._db_lock:
+                            self._writer_conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+                    except Exception as e:
+                        print(f"Error checkpointing database: {e}")
+                    last_checkpoint = time.monotonic()
+            
+            # Release flush_sessions() - once the received items are durable,
+            # or after a failed write so a locked database can't hang the menu
+            for _ in range(received):
+                self._write_queue.task_done()
+            received = 0
+            
+            if item is _STOP:
+                break
+            
+            if write_failed:
+                flush_at = time.monotonic() + self.write_interval
+            else:
+                pending = []
+                flush_at = None
+    
+    def write_batch(self, batch):
+        """Insert a batch of sessions in a single transaction"""
+        # A session counts towards the hour it started in; start_time is
+        # ISO formatted, so the hour is always characters 11-12
+        hourly = [(date, int(start[11:13]), duration)
+                  for _, _, start, _, duration, date in batch]
+        
+        with self._db_lock:
+            conn = self._writer_conn
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.executemany(_INSERT_SESSION_SQL, batch)
+                conn.executemany(_UPSERT_HOURLY_SQL, hourly)
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+    
+    def get_unsummarized_days(self, today):
+        """Dates before today that have sessions but no daily summary"""
+        with self._db_lock:
+            cursor = self._writer_conn.execute('''
+                SELECT DISTINCT date
+                FROM app_usage
+                WHERE date < ? AND date NOT IN (SELECT date FROM daily_summary)
+            ''', (today,))
+            return [date for date, in cursor.fetchall()]
+    
+    def write_daily_summaries(self, dates):
+        """Store per-app totals for each of the given dates in daily_summary"""
+        dates = sorted(dates)
+        placeholders = ", ".join("?" * len(dates))
+        
+        with self._db_lock:
+            conn = self._writer_conn
+            cursor = conn.execute(f'''
+                SELECT date, app_name, SUM(duration) as total_time
+                FROM app_usage
+                WHERE date IN ({placeholders})
+                GROUP BY date, app_name
+                ORDER BY date, total_time DESC
+            ''', dates)
+            
+            apps_by_date = {}
+            for date, app_name, total_time in cursor.fetchall():
+                apps_by_date.setdefault(date, {})[app_name] = total_time
+            
+            summaries = [(date, sum(apps.values()), json.dumps(apps))
+                         for date, apps in apps_by_date.items()]
+            
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.executemany(_REPLACE_SUMMARY_SQL, summaries)
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+    
+    def flush_sessions(self):
+        """Block until every queued session has been written"""
+        self._write_queue.put(_FLUSH)
+        self._write_queue.join()
+    
+    def session_end_time(self, idle_seconds=0):
+        """Wall-clock end of the running session, idle_seconds before now"""
+        end_time = datetime.now() - timedelta(seconds=idle_seconds)
+        # The monotonic clock stops while the Mac sleeps, so it can't give the
+        # end time - but it never runs backwards, so a wall clock set back
+        # mid-session can't shrink or reverse the recorded duration
+        elapsed = time.monotonic() - self.session_start_mono - idle_seconds
+        return max(end_time, self.session_start + timedelta(seconds=max(0, elapsed)))
+    
+    def end_session(self, idle_seconds=0):
+        """Save the running session and clear it - call with _session_lock held"""
+        if self.current_app and self.session_start:
+            self.save_session(self.current_app, self.current_window, 
+                            self.session_start, self.session_end_time(idle_seconds))
+        self.current_app = None
+        self.session_start = None
+    
+    def switch_session(self, app_name, window_title):
+        """End the running session and start one for app_name if the app changed"""
+        if app_name == self.current_app:
+            return
+        
+        # Save previous session
+        if self.current_app and self.session_start:
+            self.save_session(self.current_app, self.current_window, 
+                            self.session_start, self.session_end_time())
+        
+        # Start new session
+        self.current_app = app_name
+        self.current_window = window_title
+        self.session_start = datetime.now()
+        self.session_start_mono = time.monotonic()
+    
+    def app_activated(self, notification):
+        """Handle an app coming to the front - runs on the main thread"""
+        if not self.is_tracking or not self._awake_event.is_set():
+            return
+        
+        app_name, window_title = self.get_active_window_info()
+        with self._session_lock:
+            self.switch_session(app_name, window_title)
+    
+    def system_will_sleep(self, notification):
+        """End the running session before the Mac sleeps - runs on the main thread"""
+        with self._session_lock:
+            self._awake_event.clear()
+            self.end_session()
+        self.flush_sessions()
+    
+    def system_did_wake(self, notification):
+        """Start a session for the frontmost app after the Mac wakes"""
+        self._awake_event.set()
+        self.app_activated(notification)
     
     def track_active_window(self):
-        """Main tracking loop - runs in background thread"""
+        """Idle watchdog loop - runs in background thread"""
         while True:
             try:
-                if not self.is_tracking:
-                    time.sleep(1)
-                    continue
+                self._run_event.wait()
+                self._awake_event.wait()
                 
-                app_name, window_title = self.get_active_window_info()
-                current_time = datetime.now()
+                # Seconds since the last real keyboard/mouse input, system-wide
+                idle_time = CGEventSourceSecondsSinceLastEventType(
+                    kCGEventSourceStateHIDSystemState, kCGAnyInputEventType
+                )
                 
-                # Check for idle time
-                if self.session_start:
-                    idle_time = (current_time - self.last_activity).total_seconds()
+                with self._session_lock:
+                    if not self.is_tracking or not self._awake_event.is_set():
+                        # Paused or asleep while we were checking; the next
+                        # pass blocks on the event that was cleared
+                        continue
                     if idle_time > self.idle_threshold:
-                        # User has been idle, end previous session
-                        if self.current_app:
-                            self.save_session(self.current_app, self.current_window, 
-                                            self.session_start, self.last_activity)
-                        self.current_app = None
-                        self.session_start = None
-                
-                # Check if app changed
-                if app_name != self.current_app:
-                    # Save previous session
-                    if self.current_app and self.session_start:
-                        self.save_session(self.current_app, self.current_window, 
-                                        self.session_start, current_time)
+                        # User has been idle, end the session at their last input
+                        self.end_session(idle_time)
+                    elif not self.current_app:
+                        # No switch notification arrives at launch or when the
+                        # user comes back to the same app, so start that session here
+                        app_name, window_title = self.get_active_window_info()
+                        self.switch_session(app_name, window_title)
                     
-                    # Start new session
-                    self.current_app = app_name
-                    self.current_window = window_title
-                    self.session_start = current_time
+                    # Check often while waiting for the user to come back so the
+                    # next session starts promptly
+                    interval = self.watchdog_interval if self.current_app else self.idle_poll_interval
                 
-                self.last_activity = current_time
-                
-                # Update every 2 seconds
-                time.sleep(2)
+                time.sleep(interval)
                 
             except Exception as e:
                 print(f"Tracking error: {e}")
@@ -223,8 +707,8 @@ class TimeTrackerApp(rumps.App):
         today = datetime.now().strftime('%Y-%m-%d')
         
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
+            self.flush_sessions()
+            cursor = self._reader_conn.cursor()
             
             cursor.execute('''
                 SELECT app_name, SUM(duration) as total_time
@@ -235,7 +719,6 @@ class TimeTrackerApp(rumps.App):
             ''', (today,))
             
             results = cursor.fetchall()
-            conn.close()
             
             return results
             
@@ -246,39 +729,42 @@ class TimeTrackerApp(rumps.App):
     def get_current_session_time(self):
         """Get the duration of the current active session"""
         if self.current_app and self.session_start:
-            return int((datetime.now() - self.session_start).total_seconds())
+            return int(time.monotonic() - self.session_start_mono)
         return 0
     
-    def update_menu_display(self):
-        """Update the menu bar with live tracking info - runs in background thread"""
-        while True:
-            try:
-                if not self.is_tracking:
-                    # Show paused state
-                    self.total_time_item.title = "⏸️  Tracking Paused"
-                    self.app1_item.title = ""
-                    self.app2_item.title = ""
-                    self.app3_item.title = ""
-                    self.app4_item.title = ""
-                    self.app5_item.title = ""
-                    time.sleep(5)
-                    continue
-                
-                # Get today's stats from database
-                stats = self.get_today_stats()
+    def start_menu_timer(self):
+        """Refresh the live menu now and every 5 seconds, including while the menu is open"""
+        self.menu_timer = NSTimer.alloc().initWithFireDate_interval_repeats_block_(
+            NSDate.date(), 5, True, self.refresh_menu
+        )
+        # Not rumps.Timer: that is only scheduled in the default run loop mode,
+        # which is suspended while a menu is being tracked - exactly when the
+        # live numbers are on screen. The common modes include menu tracking.
+        NSRunLoop.currentRunLoop().addTimer_forMode_(self.menu_timer, NSRunLoopCommonModes)
+    
+    def stop_menu_timer(self):
+        """Stop the live menu refresh"""
+        self.menu_timer.invalidate()
+        self.menu_timer = None
+    
+    def refresh_menu(self, _=None):
+        """Update the menu bar with live tracking info - runs on the main thread from a timer"""
+        try:
+            if not self.is_tracking:
+                # Show paused state
+                titles = ("⏸️  Tracking Paused", "", "", "", "", "")
+            else:
+                # Start a fresh set of totals after midnight
+                if datetime.now().strftime('%Y-%m-%d') != self._today_date:
+                    self.reload_today_totals()
                 
-                # Create a dictionary to accumulate times
-                app_times = {}
-                for app_name, duration in stats:
-                    app_times[app_name] = duration
+                with self._totals_lock:
+                    app_times = dict(self._today_totals)
                 
                 # Add current session time to the active app
-                if self.current_app:
-                    current_session_time = self.get_current_session_time()
-                    if self.current_app in app_times:
-                        app_times[self.current_app] += current_session_time
-                    else:
-                        app_times[self.current_app] = current_session_time
+                current_app = self.current_app
+                if current_app:
+                    app_times[current_app] = app_times.get(current_app, 0) + self.get_current_session_time()
                 
                 # Sort by time and get top 5
                 sorted_apps = sorted(app_times.items(), key=lambda x: x[1], reverse=True)[:5]
@@ -286,19 +772,14 @@ class TimeTrackerApp(rumps.App):
                 # Calculate total time
                 total_time = sum(duration for _, duration in sorted_apps)
                 
-                # Update total time item
-                self.total_time_item.title = f"⏱️  Total: {self.format_duration(total_time)}"
-                
-                # Update app items
-                app_items = [self.app1_item, self.app2_item, self.app3_item, 
-                            self.app4_item, self.app5_item]
+                titles = [f"⏱️  Total: {self.format_duration(total_time)}"]
                 
                 for i in range(5):
                     if i < len(sorted_apps):
                         app_name, duration = sorted_apps[i]
                         
                         # Add active indicator for current app
-                        indicator = "▶ " if app_name == self.current_app else "  "
+                        indicator = "▶ " if app_name == current_app else "  "
                         
                         # Format app name (truncate if too long)
                         display_name = app_name[:20] + "..." if len(app_name) > 20 else app_name
@@ -306,19 +787,30 @@ class TimeTrackerApp(rumps.App):
                         # Calculate percentage
                         percentage = (duration / total_time * 100) if total_time > 0 else 0
                         
-                        app_items[i].title = f"{indicator}{display_name}: {self.format_duration(duration)} ({percentage:.0f}%)"
+                        titles.append(f"{indicator}{display_name}: {self.format_duration(duration)} ({percentage:.0f}%)")
                     else:
-                        # Clear unused slots
-                        app_items[i].title = ""
-                
-                # Update every 5 seconds
-                time.sleep(5)
+                        # Unused slot
+                        titles.append("")
                 
-            except Exception as e:
-                print(f"Menu update error: {e}")
-                import traceback
-                traceback.print_exc()
-                time.sleep(10)
+                titles = tuple(titles)
+            
+            # Every title change is a Cocoa menu update, so skip unchanged refreshes
+            if titles == self._last_rendered:
+                return
+            self._last_rendered = titles
+            
+            for item, title in zip(self._menu_slots, titles):
+                # Hide empty slots instead of leaving blank rows in the menu
+                hidden = not title
+                if item.hidden != hidden:
+                    item.hidden = hidden
+                if title and item.title != title:
+                    item.title = title
+            
+        except Exception as e:
+            print(f"Menu update error: {e}")
+            import traceback
+            traceback.print_exc()
     
     def format_duration(self, seconds):
         """Format seconds into readable duration"""
@@ -359,7 +851,7 @@ class TimeTrackerApp(rumps.App):
         """Generate and open detailed report"""
         report_path = self.generate_daily_report()
         if report_path:
-            os.system(f'open "{report_path}"')
+            subprocess.Popen(["open", str(report_path)])
     
     @rumps.clicked("Pause Tracking")
     def toggle_tracking(self, sender):
@@ -369,16 +861,26 @@ class TimeTrackerApp(rumps.App):
         if self.is_tracking:
             sender.title = "Pause Tracking"
             self.title = "⏱️"
+            
+            # Pick up the frontmost app now rather than at the next watchdog tick
+            app_name, window_title = self.get_active_window_info()
+            with self._session_lock:
+                self.switch_session(app_name, window_title)
+            
+            # Starting the timer refreshes the menu right away
+            self.start_menu_timer()
         else:
             sender.title = "Resume Tracking"
             self.title = "⏸️"
             
             # Save session when pausing
-            if self.current_app and self.session_start:
-                self.save_session(self.current_app, self.current_window, 
-                                self.session_start, datetime.now())
-                self.current_app = None
-                self.session_start = None
+            with self._session_lock:
+                self.end_session()
+            self.flush_sessions()
+            
+            # Nothing changes while paused, so show that once and stop refreshing
+            self.stop_menu_timer()
+            self.refresh_menu()
     
     @rumps.clicked("Export Data")
     def export_data(self, _):
@@ -386,8 +888,8 @@ class TimeTrackerApp(rumps.App):
         export_path = self.home_dir / f"export_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
         
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
+            self.flush_sessions()
+            cursor = self._reader_conn.cursor()
             
             cursor.execute('''
                 SELECT date, app_name, window_title, start_time, end_time, duration
@@ -395,15 +897,20 @@ class TimeTrackerApp(rumps.App):
                 ORDER BY start_time DESC
             ''')
             
-            with open(export_path, 'w') as f:
-                f.write("Date,Application,Window Title,Start Time,End Time,Duration (seconds)\n")
-                for row in cursor.fetchall():
-                    f.write(','.join(f'"{str(item)}"' for item in row) + '\n')
-            
-            conn.close()
+            # csv handles quotes inside window titles, and fetching in
+            # chunks keeps a long history from being loaded all at once
+            with open(export_path, 'w', newline='', buffering=1 << 20) as f:
+                writer = csv.writer(f, quoting=csv.QUOTE_ALL)
+                writer.writerow(["Date", "Application", "Window Title", "Start Time",
+                                 "End Time", "Duration (seconds)"])
+                while True:
+                    rows = cursor.fetchmany(10000)
+                    if not rows:
+                        break
+                    writer.writerows(rows)
             
             rumps.alert("Export Successful", f"Data exported to:\n{export_path}")
-            os.system(f'open "{self.home_dir}"')
+            subprocess.Popen(["open", str(self.home_dir)])
             
         except Exception as e:
             rumps.alert("Export Failed", f"Error: {str(e)}")
@@ -436,8 +943,8 @@ class TimeTrackerApp(rumps.App):
         report_path = self.home_dir / f"report_{today}.html"
         
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
+            self.flush_sessions()
+            cursor = self._reader_conn.cursor()
             
             # Get app statistics
             cursor.execute('''
@@ -452,132 +959,21 @@ class TimeTrackerApp(rumps.App):
             
             # Get hourly breakdown
             cursor.execute('''
-                SELECT strftime('%H', start_time) as hour, SUM(duration) as total_time
-                FROM app_usage
+                SELECT hour, duration
+                FROM hourly_rollup
                 WHERE date = ?
-                GROUP BY hour
-                ORDER BY hour
             ''', (today,))
             
             hourly_stats = cursor.fetchall()
             
-            conn.close()
-            
             total_time = sum(duration for _, duration, _ in app_stats)
             
-            # Generate HTML
-            html = f"""
-<!DOCTYPE html>
-<html>
-<head>
-    <title>Time Tracker Report - {today}</title>
-    <meta charset="utf-8"/>
-    <style>
-        body {{
-            font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', sans-serif;
-            max-width: 1000px;
-            margin: 0 auto;
-            padding: 20px;
-            background: #f5f5f7;
-        }}
-        .container {{
-            background: white;
-            border-radius: 12px;
-            padding: 30px;
-            box-shadow: 0 2px 10px rgba(0,0,0,0.1);
-        }}
-        h1 {{
-            color: #1d1d1f;
-            margin-bottom: 10px;
-        }}
-        .summary {{
-            background: #007aff;
-            color: white;
-            padding: 20px;
-            border-radius: 8px;
-            margin: 20px 0;
-        }}
-        .summary h2 {{
-            margin: 0 0 10px 0;
-        }}
-        table {{
-            width: 100%;
-            border-collapse: collapse;
-            margin: 20px 0;
-        }}
-        th, td {{
-            padding: 12px;
-            text-align: left;
-            border-bottom: 1px solid #e5e5e7;
-        }}
-        th {{
-            background: #f5f5f7;
-            font-weight: 600;
-        }}
-        .bar {{
-            background: #007aff;
-            height: 20px;
-            border-radius: 4px;
-            transition: width 0.3s;
-        }}
-        .bar-container {{
-            background: #e5e5e7;
-            border-radius: 4px;
-            overflow: hidden;
-        }}
-        .hour-chart {{
-            display: flex;
-            align-items: flex-end;
-            justify-content: space-between;
-            height: 200px;
-            margin: 30px 0;
-            padding: 10px;
-            border: 1px solid #e5e5e7;
-            border-radius: 8px;
-        }}
-        .hour-bar {{
-            flex: 1;
-            background: #007aff;
-            margin: 0 2px;
-            border-radius: 4px 4px 0 0;
-            min-height: 2px;
-            position: relative;
-        }}
-        .hour-label {{
-            text-align: center;
-            font-size: 11px;
-            color: #666;
-            margin-top: 5px;
-        }}
-    </style>
-</head>
-<body>
-    <div class="container">
-        <h1>Daily Time Tracking Report</h1>
-        <p style="color: #666;">Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}</p>
-        
-        <div class="summary">
-            <h2>Total Active Time</h2>
-            <h1 style="margin: 0;">{self.format_duration(total_time)}</h1>
-        </div>
-        
-        <h2>Application Usage</h2>
-        <table>
-            <thead>
-                <tr>
-                    <th>Application</th>
-                    <th>Total Time</th>
-                    <th>Sessions</th>
-                    <th>Percentage</th>
-                    <th>Usage</th>
-                </tr>
-            </thead>
-            <tbody>
-"""
-            
+            # Only the table rows and hour bars are built per report; the rest
+            # of the page comes from the template compiled at import
+            rows = []
             for app_name, duration, sessions in app_stats:
                 percentage = (duration / total_time * 100) if total_time > 0 else 0
-                html += f"""
+                rows.append(f"""
                 <tr>
                     <td><strong>{app_name}</strong></td>
                     <td>{self.format_duration(duration)}</td>
@@ -589,39 +985,33 @@ class TimeTrackerApp(rumps.App):
                         </div>
                     </td>
                 </tr>
-"""
-            
-            html += """
-            </tbody>
-        </table>
-        
-        <h2>Hourly Activity</h2>
-        <div class="hour-chart">
-"""
+""")
             
             # Create hourly chart
-            hourly_dict = {int(hour): duration for hour, duration in hourly_stats}
+            bars = []
+            hourly_dict = dict(hourly_stats)
             max_hour_time = max(hourly_dict.values()) if hourly_dict else 1
             
             for hour in range(24):
                 hour_time = hourly_dict.get(hour, 0)
                 height_percent = (hour_time / max_hour_time * 100) if max_hour_time > 0 else 0
-                html += f"""
+                bars.append(f"""
             <div style="flex: 1; display: flex; flex-direction: column; align-items: center;">
                 <div class="hour-bar" style="height: {height_percent}%" title="{self.format_duration(hour_time)}"></div>
                 <div class="hour-label">{hour:02d}:00</div>
             </div>
-"""
+""")
             
-            html += """
-        </div>
-    </div>
-</body>
-</html>
-"""
+            page = _REPORT_TEMPLATE.substitute(
+                today=today,
+                generated=datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+                total=self.format_duration(total_time),
+                rows="".join(rows),
+                bars="".join(bars),
+            )
             
             with open(report_path, 'w') as f:
-                f.write(html)
+                f.write(page)
             
             return report_path
             
@@ -634,9 +1024,12 @@ class TimeTrackerApp(rumps.App):
     def quit_app(self, _):
         """Quit the application"""
         # Save current session before quitting
-        if self.current_app and self.session_start:
-            self.save_session(self.current_app, self.current_window, 
-                            self.session_start, datetime.now())
+        with self._session_lock:
+            self.end_session()
+        
+        # Write out everything still queued before exiting
+        self._write_queue.put(_STOP)
+        self.writer_thread.join()
         
         rumps.quit_application()
 
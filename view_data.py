@@ -4,30 +4,162 @@ Time Tracker Data Viewer
 A simple utility to view your tracking data without opening the database directly
 """
 
+import atexit
+import functools
 import sqlite3
 from pathlib import Path
 from datetime import datetime, timedelta
 import sys
 
+# Importing readline is enough to give input() line editing and an
+# up-arrow history of earlier answers; it's missing on some platforms
+try:
+    import readline
+except ImportError:
+    pass
+
+
+# Totals repeat between screens during one viewer session, so remember them
+@functools.lru_cache(maxsize=4096)
+def _format_duration(seconds):
+    hours, rest = divmod(seconds, 3600)
+    minutes, secs = divmod(rest, 60)
+    
+    if hours > 0:
+        return f"{hours}h {minutes}m {secs}s"
+    elif minutes > 0:
+        return f"{minutes}m {secs}s"
+    else:
+        return f"{secs}s"
+
+
+def _duration_sql(column):
+    """SQL expression that renders `column` seconds exactly like format_duration"""
+    return f"""CASE
+        WHEN {column} >= 3600 THEN printf('%dh %dm %ds', {column} / 3600, {column} % 3600 / 60, {column} % 60)
+        WHEN {column} >= 60 THEN printf('%dm %ds', {column} / 60, {column} % 60)
+        ELSE printf('%ds', {column})
+    END"""
+
+
+# Each query is one constant string, so repeated menu actions reuse the
+# connection's cached prepared statement instead of compiling it again.
+# Per-row durations come back already formatted by SQLite, and totals and
+# percentages are window sums over the rows being listed.
+_DATE_STATS_SQL = f'''
+    SELECT app_name, total_time, sessions, {_duration_sql('total_time')},
+           COALESCE(total_time * 1.0 / NULLIF(SUM(total_time) OVER (), 0) * 100, 0),
+           SUM(total_time) OVER ()
+    FROM (
+        SELECT app_name, SUM(duration) as total_time, COUNT(*) as sessions
+        FROM app_usage
+        WHERE date = ?
+        GROUP BY app_name
+    )
+    ORDER BY total_time DESC
+'''
+
+_DAILY_TOTALS_SQL = '''
+    SELECT date, SUM(duration), COUNT(DISTINCT app_name)
+    FROM app_usage
+    WHERE date BETWEEN ? AND ?
+    GROUP BY date
+'''
+
+# The percentage is each app's share of the top 20, so the window has to
+# run over the already limited rows
+_TOP_APPS_SQL = f'''
+    SELECT app_name, total_time, total_sessions, days_used, {_duration_sql('total_time')},
+           COALESCE(total_time * 1.0 / NULLIF(SUM(total_time) OVER (), 0) * 100, 0)
+    FROM (
+        SELECT app_name, SUM(duration) as total_time, COUNT(*) as total_sessions,
+               COUNT(DISTINCT date) as days_used
+        FROM app_usage
+        GROUP BY app_name
+        ORDER BY total_time DESC
+        LIMIT 20
+    )
+    ORDER BY total_time DESC
+'''
+
+_APP_HISTORY_SQL = f'''
+    SELECT date, total_time, sessions, {_duration_sql('total_time')},
+           SUM(total_time) OVER (), SUM(sessions) OVER ()
+    FROM (
+        SELECT date, SUM(duration) as total_time, COUNT(*) as sessions
+        FROM app_usage
+        WHERE app_name LIKE ?
+        GROUP BY date
+        ORDER BY date DESC
+        LIMIT 30
+    )
+    ORDER BY date DESC
+'''
+
+_DAY_NAMES = ('Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday')
+
+# Table row templates, filled in column order
+# (app_name, formatted time, sessions, percentage)
+_DAY_ROW = "{:<30} {:<15} {:<10} {:>5.1f}%".format
+# (app_name, formatted time, sessions, days, percentage)
+_TOP_APP_ROW = "{:<25} {:<15} {:<12} {:<8} {:>5.1f}%".format
+# (date, formatted time, sessions)
+_HISTORY_ROW = "{:<15} {:<20} {}".format
+
 class DataViewer:
     def __init__(self):
         self.db_path = Path.home() / ".timetracker" / "tracking.db"
         if not self.db_path.exists():
             print("❌ No tracking database found. Have you started the tracker yet?")
             sys.exit(1)
+        
+        self.init_indexes()
+        
+        # One read-only connection for the whole session, so the schema and
+        # page cache survive from one menu action to the next. Every view
+        # only reads, and a read-only connection never takes a write lock.
+        self.conn = sqlite3.connect(f"{self.db_path.as_uri()}?mode=ro", uri=True,
+                                    isolation_level=None, cached_statements=128)
+        self.conn.execute("PRAGMA cache_size=-64000")  # 64 MB
+        self.conn.execute("PRAGMA temp_store=MEMORY")  # GROUP BY sorts stay in RAM
+        self.conn.execute("PRAGMA mmap_size=268435456")  # 256 MB
+        atexit.register(self.conn.close)
+        
+        self._menu = {
+            '1': self.view_today,
+            '2': self.view_yesterday,
+            '3': self.view_last_7_days,
+            '4': self.view_specific_date,
+            '5': self.view_top_apps,
+            '6': self.search_by_app,
+        }
+    
+    def init_indexes(self):
+        """Create the indexes the viewer's queries rely on"""
+        # Schema changes need a writable connection, held only for this
+        conn = sqlite3.connect(self.db_path, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        cursor = conn.cursor()
+        
+        # Same covering index the tracker creates: per-date GROUP BY app_name
+        # and SUM(duration) are answered without reading table rows
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_date_app_dur
+            ON app_usage(date, app_name, duration)
+        ''')
+        
+        # Covering index in app order: the all-time top apps GROUP BY
+        # app_name streams groups from it instead of sorting every row first
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_app_dur_date
+            ON app_usage(app_name, duration, date)
+        ''')
+        
+        conn.close()
     
     def format_duration(self, seconds):
         """Format seconds into readable duration"""
-        hours = seconds // 3600
-        minutes = (seconds % 3600) // 60
-        secs = seconds % 60
-        
-        if hours > 0:
-            return f"{hours}h {minutes}m {secs}s"
-        elif minutes > 0:
-            return f"{minutes}m {secs}s"
-        else:
-            return f"{secs}s"
+        return _format_duration(seconds)
     
     def show_menu(self):
         """Display main menu"""
@@ -48,19 +180,9 @@ class DataViewer:
     
     def get_date_stats(self, date_str):
         """Get statistics for a specific date"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            SELECT app_name, SUM(duration) as total_time, COUNT(*) as sessions
-            FROM app_usage
-            WHERE date = ?
-            GROUP BY app_name
-            ORDER BY total_time DESC
-        ''', (date_str,))
+        cursor = self.conn.execute(_DATE_STATS_SQL, (date_str,))
         
         results = cursor.fetchall()
-        conn.close()
         
         return results
     
@@ -72,19 +194,26 @@ class DataViewer:
             print(f"\n❌ No data found for {date_str}")
             return
         
-        total_time = sum(duration for _, duration, _ in stats)
+        # The window sum repeats the day's total on every row
+        _, _, _, _, _, total_time = stats[0]
+        
+        # Collect the screen and write it once instead of print() per line
+        lines = [
+            f"\n{'='*60}",
+            f"  {title} - {date_str}",
+            f"{'='*60}",
+            f"\n⏱️  Total Active Time: {self.format_duration(total_time)}",
+            f"📱 Applications Used: {len(stats)}",
+            f"\n{'Application':<30} {'Time':<15} {'Sessions':<10} {'%'}",
+            "-"*60,
+        ]
         
-        print(f"\n{'='*60}")
-        print(f"  {title} - {date_str}")
-        print(f"{'='*60}")
-        print(f"\n⏱️  Total Active Time: {self.format_duration(total_time)}")
-        print(f"📱 Applications Used: {len(stats)}")
-        print(f"\n{'Application':<30} {'Time':<15} {'Sessions':<10} {'%'}")
-        print("-"*60)
+        lines.extend(
+            _DAY_ROW(app_name, duration, sessions, percentage)
+            for app_name, _, sessions, duration, percentage, _ in stats
+        )
         
-        for app_name, duration, sessions in stats:
-            percentage = (duration / total_time * 100) if total_time > 0 else 0
-            print(f"{app_name:<30} {self.format_duration(duration):<15} {sessions:<10} {percentage:>5.1f}%")
+        sys.stdout.write("\n".join(lines) + "\n")
     
     def view_today(self):
         """View today's summary"""
@@ -98,37 +227,36 @@ class DataViewer:
     
     def view_last_7_days(self):
         """View summary for last 7 days"""
-        print(f"\n{'='*60}")
-        print("  LAST 7 DAYS SUMMARY")
-        print(f"{'='*60}")
+        lines = [
+            f"\n{'='*60}",
+            "  LAST 7 DAYS SUMMARY",
+            f"{'='*60}",
+        ]
         
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        # Work out all seven days from a single clock reading
+        today = datetime.now().date()
+        days = [today - timedelta(days=i) for i in range(7)]
         
-        # Get data for last 7 days
-        for i in range(7):
-            date = (datetime.now() - timedelta(days=i)).strftime('%Y-%m-%d')
-            
-            cursor.execute('''
-                SELECT SUM(duration), COUNT(DISTINCT app_name)
-                FROM app_usage
-                WHERE date = ?
-            ''', (date,))
-            
-            result = cursor.fetchone()
-            total_time = result[0] if result[0] else 0
-            app_count = result[1] if result[1] else 0
+        # Get data for last 7 days in one range scan
+        cursor = self.conn.execute(_DAILY_TOTALS_SQL,
+                                   (days[-1].isoformat(), days[0].isoformat()))
+        
+        totals = {date: (total_time, app_count) for date, total_time, app_count in cursor.fetchall()}
+        
+        for day in days:
+            date = day.isoformat()
+            total_time, app_count = totals.get(date, (0, 0))
             
-            day_name = (datetime.now() - timedelta(days=i)).strftime('%A')
+            day_name = _DAY_NAMES[day.weekday()]
             
-            print(f"\n{day_name}, {date}:")
+            lines.append(f"\n{day_name}, {date}:")
             if total_time > 0:
-                print(f"  ⏱️  Active Time: {self.format_duration(total_time)}")
-                print(f"  📱 Apps Used: {app_count}")
+                lines.append(f"  ⏱️  Active Time: {self.format_duration(total_time)}")
+                lines.append(f"  📱 Apps Used: {app_count}")
             else:
-                print("  No data")
+                lines.append("  No data")
         
-        conn.close()
+        sys.stdout.write("\n".join(lines) + "\n")
     
     def view_specific_date(self):
         """View data for a specific date"""
@@ -143,98 +271,75 @@ class DataViewer:
     
     def view_top_apps(self):
         """View all-time top applications"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            SELECT app_name, SUM(duration) as total_time, COUNT(*) as total_sessions,
-                   COUNT(DISTINCT date) as days_used
-            FROM app_usage
-            GROUP BY app_name
-            ORDER BY total_time DESC
-            LIMIT 20
-        ''')
+        cursor = self.conn.execute(_TOP_APPS_SQL)
         
         results = cursor.fetchall()
-        conn.close()
         
         if not results:
             print("\n❌ No data found")
             return
         
-        total_time = sum(duration for _, duration, _, _ in results)
+        lines = [
+            f"\n{'='*70}",
+            "  🏆 ALL-TIME TOP APPLICATIONS",
+            f"{'='*70}",
+            f"\n{'Application':<25} {'Total Time':<15} {'Sessions':<12} {'Days':<8} {'%'}",
+            "-"*70,
+        ]
         
-        print(f"\n{'='*70}")
-        print("  🏆 ALL-TIME TOP APPLICATIONS")
-        print(f"{'='*70}")
-        print(f"\n{'Application':<25} {'Total Time':<15} {'Sessions':<12} {'Days':<8} {'%'}")
-        print("-"*70)
+        lines.extend(
+            _TOP_APP_ROW(app_name, duration, sessions, days, percentage)
+            for app_name, _, sessions, days, duration, percentage in results
+        )
         
-        for app_name, duration, sessions, days in results:
-            percentage = (duration / total_time * 100) if total_time > 0 else 0
-            print(f"{app_name:<25} {self.format_duration(duration):<15} {sessions:<12} {days:<8} {percentage:>5.1f}%")
+        sys.stdout.write("\n".join(lines) + "\n")
     
     def search_by_app(self):
         """Search and view data for a specific application"""
         app_name = input("\nEnter application name (e.g., Safari, Terminal): ").strip()
         
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            SELECT date, SUM(duration) as total_time, COUNT(*) as sessions
-            FROM app_usage
-            WHERE app_name LIKE ?
-            GROUP BY date
-            ORDER BY date DESC
-            LIMIT 30
-        ''', (f'%{app_name}%',))
+        cursor = self.conn.execute(_APP_HISTORY_SQL, (f'%{app_name}%',))
         
         results = cursor.fetchall()
-        conn.close()
         
         if not results:
             print(f"\n❌ No data found for '{app_name}'")
             return
         
-        total_time = sum(duration for _, duration, _ in results)
-        total_sessions = sum(sessions for _, _, sessions in results)
+        # The window sums repeat the overall totals on every row
+        _, _, _, _, total_time, total_sessions = results[0]
         
-        print(f"\n{'='*60}")
-        print(f"  📊 USAGE HISTORY: {app_name}")
-        print(f"{'='*60}")
-        print(f"\nTotal Time: {self.format_duration(total_time)}")
-        print(f"Total Sessions: {total_sessions}")
-        print(f"Days Used: {len(results)}")
+        lines = [
+            f"\n{'='*60}",
+            f"  📊 USAGE HISTORY: {app_name}",
+            f"{'='*60}",
+            f"\nTotal Time: {self.format_duration(total_time)}",
+            f"Total Sessions: {total_sessions}",
+            f"Days Used: {len(results)}",
+            f"\n{'Date':<15} {'Time':<20} {'Sessions'}",
+            "-"*60,
+        ]
         
-        print(f"\n{'Date':<15} {'Time':<20} {'Sessions'}")
-        print("-"*60)
+        lines.extend(
+            _HISTORY_ROW(date, duration, sessions)
+            for date, _, sessions, duration, _, _ in results[:20]  # Show last 20 days
+        )
         
-        for date, duration, sessions in results[:20]:  # Show last 20 days
-            print(f"{date:<15} {self.format_duration(duration):<20} {sessions}")
+        sys.stdout.write("\n".join(lines) + "\n")
+    
+    def _invalid_choice(self):
+        print("\n❌ Invalid choice. Please try again.")
     
     def run(self):
         """Main application loop"""
         while True:
             choice = self.show_menu()
             
-            if choice == '1':
-                self.view_today()
-            elif choice == '2':
-                self.view_yesterday()
-            elif choice == '3':
-                self.view_last_7_days()
-            elif choice == '4':
-                self.view_specific_date()
-            elif choice == '5':
-                self.view_top_apps()
-            elif choice == '6':
-                self.search_by_app()
-            elif choice == '7':
+            if choice == '7':
                 print("\n👋 Goodbye!")
                 break
-            else:
-                print("\n❌ Invalid choice. Please try again.")
+            
+            self._menu.get(choice, self._invalid_choice)()
             
             input("\nPress Enter to continue...")
 